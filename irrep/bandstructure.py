@@ -16,8 +16,9 @@
 ##################################################################
 
 
-import copy
 import functools
+import io
+import itertools
 
 import numpy as np
 import numpy.linalg as la
@@ -26,7 +27,7 @@ from .readfiles import ParserAbinit, ParserVasp, ParserEspresso, ParserW90
 from .kpoint import Kpoint
 from .spacegroup import SpaceGroup
 from .gvectors import sortIG, calc_gvectors
-from .utility import log_message
+from .utility import log_message, leading_minors, polar_factor
 
 
 class BandStructure:
@@ -86,6 +87,10 @@ class BandStructure:
     save_wf : bool
         Whether wave functions should be kept as attribute after calculating 
         traces.
+    wf_dtype : data type, default=None
+        Complex type in which the coefficients of wave functions are stored, 
+        e.g. `np.complex64` to halve memory usage. By default, the precision 
+        of the file is kept (single for VASP, double for the other codes).
     v : int, default=0
         Number controlling the verbosity. 
         0: minimalistic printing. 
@@ -158,6 +163,7 @@ class BandStructure:
         trans_thresh=1e-5,
         degen_thresh=1e-8,
         save_wf=True,
+        wf_dtype=None,
         v=0,
         alat=None,
         from_sym_file=None,
@@ -251,7 +257,7 @@ class BandStructure:
             return
 
         # Set Fermi energy
-        if EF.lower() == "auto":
+        if isinstance(EF, str) and EF.lower() == "auto":
             if EF_in is None:
                 self.efermi = 0.0
                 msg = "WARNING : fermi-energy not found. Setting it as 0 eV"
@@ -261,7 +267,7 @@ class BandStructure:
         else:
             try:
                 self.efermi = float(EF)
-            except:
+            except (TypeError, ValueError):
                 raise RuntimeError("Invalid value for keyword EF. It must be "
                                    "a number or 'auto'")
 
@@ -285,10 +291,7 @@ class BandStructure:
             self.Ecut = Ecut
 
         # Calculate vectors of reciprocal lattice
-        self.RecLattice = np.zeros((3,3), dtype=float)
-        for i in range(3):
-            self.RecLattice[i] = np.cross(self.Lattice[(i + 1) % 3], self.Lattice[(i + 2) % 3])
-        self.RecLattice *= (2.0*np.pi/np.linalg.det(self.Lattice))
+        self.RecLattice = 2.0 * np.pi * np.linalg.inv(self.Lattice).T
 
         # To do: create writer of description for this class
         msg = ("WAVECAR contains {} k-points and {} bands.\n"
@@ -304,17 +307,21 @@ class BandStructure:
         if kplist is None:
             kplist = range(NK)
         else:
-            kplist -= 1
-            kplist = np.array([k for k in kplist if k >= 0 and k < NK])
+            kplist = np.asarray(kplist, dtype=int) - 1
+            kplist = kplist[(kplist >= 0) & (kplist < NK)]
 
         # Parse wave functions at each k-point
+        symmetries_SG = self.spacegroup.symmetries
+        refUC_SG = self.spacegroup.refUC
+        shiftUC_SG = self.spacegroup.shiftUC
+        symmetries_tables = self.spacegroup.symmetries_tables
         self.kpoints = []
         for ik in kplist:
 
             if code == 'vasp':
                 msg = f'Parsing wave functions at k-point #{ik:>3d}'
                 log_message(msg, v, 2)
-                WF, Energy, kpt, npw = parser.parse_kpoint(ik, NBin, self.spinor)
+                Energy, kpt, npw = parser.parse_kpoint_header(ik, NBin, self.spinor)
                 kg = calc_gvectors(kpt,
                                    self.RecLattice,
                                    self.Ecut0,
@@ -326,8 +333,12 @@ class BandStructure:
                 if not self.spinor:
                     selectG = kg[3]
                 else:
-                    selectG = np.hstack((kg[3], kg[3] + int(npw / 2)))
-                WF = WF[:, selectG]
+                    ng = kg.shape[1]
+                    selectG = np.empty(2 * ng, dtype=int)
+                    selectG[:ng] = kg[3]
+                    selectG[ng:] = kg[3] + npw // 2
+                # only the selected bands and plane-waves are read
+                WF = parser.parse_wf(ik, NBin, npw, slice(IBstart, IBend), selectG)
 
             elif code == 'abinit':
                 NBin = parser.nband[ik]
@@ -335,13 +346,13 @@ class BandStructure:
                 msg = f'Parsing wave functions at k-point #{ik:>3d}: {kpt}'
                 log_message(msg, v, 2)
                 WF, Energy, kg = parser.parse_kpoint(ik)
-                WF, kg = sortIG(ik, kg, kpt, WF, self.RecLattice, self.Ecut0, self.Ecut, self.spinor)
+                WF, kg = sortIG(ik, kg, kpt, WF[IBstart:IBend], self.RecLattice, self.Ecut0, self.Ecut, self.spinor)
 
             elif code == 'espresso':
                 msg = f'Parsing wave functions at k-point #{ik:>3d}'
                 log_message(msg, v, 2)
                 WF, Energy, kg, kpt = parser.parse_kpoint(ik, NBin, spin_channel, v=v)
-                WF, kg = sortIG(ik+1, kg, kpt, WF, self.RecLattice/2.0, self.Ecut0, self.Ecut, self.spinor)
+                WF, kg = sortIG(ik+1, kg, kpt, WF[IBstart:IBend], self.RecLattice/2.0, self.Ecut0, self.Ecut, self.spinor)
 
             elif code == 'wannier90':
                 kpt = kpred[ik]
@@ -357,17 +368,18 @@ class BandStructure:
                 selectG = tuple(kg[0:3])
                 msg = f'Parsing wave functions at k-point #{ik:>3d}: {kpt}'
                 log_message(msg, v, 2)
-                WF = parser.parse_kpoint(ik+1, selectG)
+                WF = parser.parse_kpoint(ik+1, selectG)[IBstart:IBend]
 
             # Pick energy of IBend+1 band to calculate gaps
-            try:
+            if IBend < len(Energy):
                 upper = Energy[IBend] - self.efermi
-            except BaseException:
+            else:
                 upper = np.nan
 
             # Preserve only bands in between IBstart and IBend
-            WF = WF[IBstart:IBend]
             Energy = Energy[IBstart:IBend] - self.efermi
+            if wf_dtype is not None:
+                WF = WF.astype(wf_dtype, copy=False)
 
             kp = Kpoint(
                 ik=ik,
@@ -379,12 +391,12 @@ class BandStructure:
                 num_bands=NBout,
                 RecLattice=self.RecLattice,
                 calculate_traces=calculate_traces,
-                symmetries_SG=self.spacegroup.symmetries,
+                symmetries_SG=symmetries_SG,
                 spinor=self.spinor,
                 degen_thresh=degen_thresh,
-                refUC=self.spacegroup.refUC,
-                shiftUC=self.spacegroup.shiftUC,
-                symmetries_tables=self.spacegroup.symmetries_tables,
+                refUC=refUC_SG,
+                shiftUC=shiftUC_SG,
+                symmetries_tables=symmetries_tables,
                 save_wf=save_wf,
                 v=v
                 )
@@ -411,10 +423,16 @@ class BandStructure:
             Verbosity level. Default set to minimalistic printing
         '''
 
+        # Tables are read once per label and k-point (modulo a reciprocal
+        # lattice vector), k-points of a path often share their labels
+        tables = {}
         for ik, KP in enumerate(self.kpoints):
             
             if kpnames is not None:
-                irreps = self.spacegroup.get_irreps_from_table(kpnames[ik], KP.k, v=v)
+                key = (kpnames[ik], tuple(np.round(KP.k, 5) % 1))
+                if key not in tables:
+                    tables[key] = self.spacegroup.get_irreps_from_table(kpnames[ik], KP.k, v=v)
+                irreps = tables[key]
             else:
                 irreps = None
             KP.identify_irreps(irreptable=irreps)
@@ -506,6 +524,36 @@ class BandStructure:
 
         return json_data
 
+    def _kpoints_direct(self):
+        '''
+        Direct coordinates of the k-points. Unlike :meth:`_band_edges`, it 
+        does not need traces to be calculated.
+
+        Returns
+        -------
+        array, shape=(NK,3)
+            Each row contains the direct coordinates of a k-point.
+        '''
+        return np.array([KP.k for KP in self.kpoints],
+                        dtype=float).reshape(-1, 3)
+
+    def _band_edges(self):
+        '''
+        Gather in arrays (one element per k-point) the energies needed to 
+        compute gaps.
+
+        Returns
+        -------
+        upper : array
+            Energy of the first band above the set at each k-point.
+        Elast : array
+            Highest energy-level of the set at each k-point.
+        '''
+        upper = np.array([KP.upper for KP in self.kpoints], dtype=float)
+        Elast = np.array([KP.Energy_mean[-1] for KP in self.kpoints],
+                         dtype=float)
+        return upper, Elast
+
     @property
     def gap_direct(self):
         '''
@@ -517,10 +565,9 @@ class BandStructure:
             Smallest direct gap
         '''
 
-        gap = np.inf
-        for KP in self.kpoints:
-            gap = min(gap, KP.upper-KP.Energy_mean[-1])
-        return gap
+        upper, Elast = self._band_edges()
+        gap = upper - Elast
+        return float(np.min(gap, initial=np.inf, where=~np.isnan(gap)))
 
     @property
     def gap_indirect(self):
@@ -533,12 +580,12 @@ class BandStructure:
             Smallest indirect gap
         '''
 
-        min_upper = np.inf  # smallest energy of bands above set
-        max_lower = -np.inf  # largest energy of bands in the set
-        for KP in self.kpoints:
-            min_upper = min(min_upper, KP.upper)
-            max_lower = max(max_lower, KP.Energy_mean[-1])
-        return min_upper - max_lower
+        upper, Elast = self._band_edges()
+        # smallest energy of bands above set
+        min_upper = np.min(upper, initial=np.inf, where=~np.isnan(upper))
+        # largest energy of bands in the set
+        max_lower = np.max(Elast, initial=-np.inf, where=~np.isnan(Elast))
+        return float(min_upper - max_lower)
 
     @property
     def num_bandinvs(self):
@@ -552,21 +599,19 @@ class BandStructure:
             inversion symmetric.
         '''
 
-        num_bandinvs = 0
-        for KP in self.kpoints:
-            if KP.num_bandinvs is not None:
-                num_bandinvs += KP.num_bandinvs
-        return num_bandinvs
+        return sum(KP.num_bandinvs for KP in self.kpoints
+                   if KP.num_bandinvs is not None)
 
     def write_irrepsfile(self):
         '''
         Write the file `irreps.dat` with the identified irreps.
         '''
 
-        file = open('irreps.dat', 'w')
+        buf = io.StringIO()
         for KP in self.kpoints:
-            KP.write_irrepsfile(file)
-        file.close()
+            KP.write_irrepsfile(buf)
+        with open('irreps.dat', 'w') as file:
+            file.write(buf.getvalue())
 
 
     @property
@@ -601,7 +646,7 @@ class BandStructure:
         in `BCS <https://www.cryst.ehu.es/cgi-bin/cryst/programs/topological.pl>`_ .
         """
 
-        f = open("trace.txt", "w")
+        f = io.StringIO()
         f.write(
             (
                 " {0}  \n"
@@ -615,18 +660,13 @@ class BandStructure:
         # Number of maximal k-vectors in the space group. In the next files
         # introduce the components of the maximal k-vectors))
         f.write("  {0}  \n".format(len(self.kpoints)))
-        for KP in self.kpoints:
-            f.write(
-                "   ".join(
-                    "{0:10.6f}".format(x)
-                    for x in KP.k
-                )
-                + "\n"
-            )
-        for KP in self.kpoints:
-            f.write(
-                KP.write_trace()
-            )
+        np.savetxt(f,
+                   np.array([KP.k for KP in self.kpoints]).reshape(-1, 3),
+                   fmt="%10.6f",
+                   delimiter="   ")
+        f.write("".join(KP.write_trace() for KP in self.kpoints))
+        with open("trace.txt", "w") as file:
+            file.write(f.getvalue())
 
     def Separate(self, isymop, degen_thresh=1e-5, groupKramers=True, v=0):
         """
@@ -665,65 +705,117 @@ class BandStructure:
             for kp in self.kpoints
         ] # each element is a dict with separated bandstructure of a k-point
 
-        allvalues = np.array(sum((list(kps.keys()) for kps in kpseparated), []))
-        #        print (allvalues)
-        #        for kps in kpseparated :
-        #            allvalues=allvalues | set( kps.keys())
-        #        allvalues=np.array(allavalues)
+        allvalues = np.array([val for kps in kpseparated for val in kps])
         if groupKramers:
-            allvalues = allvalues[np.argsort(np.real(allvalues))].real
+            allvalues = np.sort(allvalues.real)
             borders = np.hstack(
-                (
-                    [0],
-                    np.where(abs(allvalues[1:] - allvalues[:-1]) > 0.01)[0] + 1,
-                    [len(allvalues)],
-                )
+                ([0], np.where(np.diff(allvalues) > 0.01)[0] + 1)
             )
-            #            nv=len(allvalues)
-            if len(borders) > 2:
+            if len(borders) > 1:
+                counts = np.diff(np.hstack((borders, [len(allvalues)])))
                 allvalues = set(
-                    [allvalues[b1:b2].mean() for b1, b2 in zip(borders, borders[1:])]
+                    np.add.reduceat(allvalues, borders) / counts
                 ) # unrepeated Re parts of all eigenvalues
-                subspaces = {}
-                for v in allvalues:
-                    other = copy.copy(self)
-                    other.kpoints = []
-                    for K in kpseparated:
-                        vk = list(K.keys())
-                        vk0 = vk[np.argmin(np.abs(v - vk))]
-                        if abs(vk0 - v) < 0.05:
-                            other.kpoints.append(K[vk0])
-                    subspaces[v] = other # unnecessary indent ?
-                return subspaces
+                return self._subspaces(kpseparated, allvalues)
             else:
                 return dict({allvalues.mean(): self})
         else:
             allvalues = allvalues[np.argsort(np.angle(allvalues))]
-            log_message(f'allvalues: {allvalues}', v, 1)
+            log_message(lambda: f'allvalues: {allvalues}', v, 1)
             borders = np.where(abs(allvalues - np.roll(allvalues, 1)) > 0.01)[0]
-            nv = len(allvalues)
             if len(borders) > 0:
-                allvalues = set(
-                    [
-                        np.roll(allvalues, -b1)[: (b2 - b1) % nv].mean()
-                        for b1, b2 in zip(borders, np.roll(borders, -1))
-                    ]
-                )
-                log_message(f'Distinct values: {allvalues}', v, 1)
-                subspaces = {}
-                for v in allvalues:
-                    other = copy.copy(self)
-                    other.kpoints = []
-                    for K in kpseparated:
-                        vk = list(K.keys())
-                        vk0 = vk[np.argmin(np.abs(v - vk))]
-                        if abs(vk0 - v) < 0.05:
-                            other.kpoints.append(K[vk0])
-                        subspaces[v] = other
-                return subspaces
+                # groups are contiguous modulo len(allvalues): roll them to
+                # make the first group start at index 0
+                rolled = np.roll(allvalues, -borders[0])
+                borders = borders - borders[0]
+                counts = np.diff(np.hstack((borders, [len(allvalues)])))
+                allvalues = set(np.add.reduceat(rolled, borders) / counts)
+                log_message(lambda: f'Distinct values: {allvalues}', v, 1)
+                return self._subspaces(kpseparated, allvalues)
             else:
                 return dict({allvalues.mean(): self})
 
+    @classmethod
+    def _empty_like(cls, parent):
+        """
+        Create an instance without k-points sharing the crystal structure, 
+        symmetries and energy parameters of `parent`, without running 
+        `__init__`. Used to hold the subspaces returned by :meth:`Separate`.
+
+        Parameters
+        ----------
+        parent : class
+            Instance of `BandStructure`.
+
+        Returns
+        -------
+        other : class
+            Instance of `BandStructure` with an empty list `kpoints`.
+        """
+        other = cls.__new__(cls)
+        other.spinor = parent.spinor
+        other.Lattice = parent.Lattice
+        other.RecLattice = parent.RecLattice
+        other.spacegroup = parent.spacegroup
+        other.efermi = parent.efermi
+        other.Ecut0 = parent.Ecut0
+        other.Ecut = parent.Ecut
+        other.kpoints = []
+        return other
+
+    def _subspaces(self, kpseparated, allvalues, tol=0.05):
+        """
+        Group the separated k-points in subspaces, one for each distinct 
+        eigenvalue of the symmetry.
+
+        Parameters
+        ----------
+        kpseparated : list
+            Each element is the `dict` returned by :meth:`Kpoint.Separate`.
+        allvalues : iterable
+            Distinct eigenvalues of the symmetry.
+        tol : float, default=0.05
+            Largest distance between an eigenvalue in a k-point and the 
+            eigenvalue of the subspace.
+
+        Returns
+        -------
+        subspaces : dict
+            Each key is an eigenvalue and the value is an instance of 
+            `BandStructure` for the subspace of that eigenvalue.
+        """
+        allvalues = list(allvalues)
+        subspaces = {}
+        for v in allvalues:
+            other = BandStructure._empty_like(self)
+            subspaces[v] = other
+        values = np.array(allvalues)
+        for K in kpseparated:
+            # closest eigenvalue in the k-point to each distinct eigenvalue
+            vk = list(K.keys())
+            dist = np.abs(values[:, None] - np.array(vk)[None, :])
+            closest = np.argmin(dist, axis=1)
+            for v, ik, d in zip(allvalues, closest, dist[np.arange(len(values)), closest]):
+                if d < tol:
+                    subspaces[v].kpoints.append(K[vk[ik]])
+        return subspaces
+
+    def _overlaps(self):
+        """
+        Overlap matrices between consecutive k-points of the closed path 
+        (the last k-point is connected to the first one). They are shared 
+        by :meth:`zakphase` and :meth:`wcc`.
+
+        Returns
+        -------
+        list
+            The :math:`i^{th}` element is the overlap matrix between 
+            :math:`i^{th}` and :math:`(i+1)^{th}` k-points.
+        """
+        following = itertools.chain(
+            itertools.islice(self.kpoints, 1, None), self.kpoints[:1])
+        return [KP.overlap(KPnext) for KP, KPnext in zip(self.kpoints, following)]
+
     def zakphase(self):
         """
         Calculate Zak phases along a path for a set of states.
@@ -744,37 +836,33 @@ class BandStructure:
             k-point of the path. The :math:`i^{th}` column is the local gap 
             between :math:`i^{th}` and :math:`(i+1)^{th}` bands.
         """
-        overlaps = [
-            x.overlap(y)
-            for x, y in zip(self.kpoints, self.kpoints[1:] + [self.kpoints[0]])
-        ]
+        overlaps = self._overlaps()
+        # overlaps of the first band. Matrices of different k-points may
+        # differ in shape (subspaces from Separate), so only O[0, 0] is stacked
+        O00 = np.array([O[0, 0] for O in overlaps])
+        phases = np.angle(O00)
         print("overlaps")
-        for O in overlaps:
-            print(np.abs(O[0, 0]), np.angle(O[0, 0]))
-        print("   sum  ", np.sum(np.angle(O[0, 0]) for O in overlaps) / np.pi)
+        for a, p in zip(np.abs(O00), phases):
+            print(a, p)
+        print("   sum  ", phases.sum() / np.pi)
         #        overlaps.append(self.kpoints[-1].overlap(self.kpoints[0],g=np.array( (self.kpoints[-1].K-self.kpoints[0].K).round(),dtype=int )  )  )
-        nmax = np.min([o.shape for o in overlaps])
+        nmax = min(min(o.shape) for o in overlaps)
         # calculate zak phase in incresing dimension of the subspace (1 band,
         # 2 bands, 3 bands,...)
-        z = np.angle(
-            [[la.det(O[:n, :n]) for n in range(1, nmax + 1)] for O in overlaps]
-        ).sum(axis=0) % (2 * np.pi)
-        #        print (np.array([k.Energy[1:] for k in self.kpoints] ))
-        #        print (np.min([k.Energy[1:] for k in self.kpoints],axis=0) )
-        emin = np.hstack(
-            (np.min([k.Energy[1:nmax] for k in self.kpoints], axis=0), [np.inf])
-        )
-        emax = np.max([k.Energy[:nmax] for k in self.kpoints], axis=0)
-        locgap = np.hstack(
-            (
-                np.min(
-                    [k.Energy[1:nmax] - k.Energy[0 : nmax - 1] for k in self.kpoints],
-                    axis=0,
-                ),
-                [np.inf],
-            )
-        )
-        return z, emin - emax, (emin + emax) / 2, locgap
+        dets = leading_minors([O[:nmax, :nmax] for O in overlaps])
+        z = np.angle(dets).sum(axis=0) % (2 * np.pi)
+        # energies of the first nmax bands, one row per k-point
+        E = np.array([k.Energy_raw[:nmax] for k in self.kpoints])
+        # above the last band, emin and locgap are infinite
+        emin = np.full(E.shape[1], np.inf)
+        E[:, 1:].min(axis=0, out=emin[:-1])
+        emax = E.max(axis=0)
+        locgap = np.full(E.shape[1], np.inf)
+        np.diff(E, axis=1).min(axis=0, out=locgap[:-1])
+        gap = np.subtract(emin, emax)
+        mid = np.add(emin, emax)
+        mid /= 2
+        return z, gap, mid, locgap
 
     def wcc(self):
         """
@@ -786,15 +874,24 @@ class BandStructure:
             Eigenvalues of the Wilson loop operator, divided by :math:`2\pi`.
 
         """
-        overlaps = [
-            x.overlap(y)
-            for x, y in zip(self.kpoints, self.kpoints[1:] + [self.kpoints[0]])
-        ]
-        wilson = functools.reduce(
-            np.dot,
-            [functools.reduce(np.dot, np.linalg.svd(O)[0:3:2]) for O in overlaps],
-        )
-        return np.sort((np.angle(np.linalg.eig(wilson)) / (2 * np.pi)) % 1)
+        overlaps = self._overlaps()
+        if len(set(O.shape for O in overlaps)) == 1:
+            # all decompositions in one batched call, and the product
+            # accumulated alternating between two buffers
+            factors = polar_factor(np.array(overlaps))
+            wilson = np.eye(factors.shape[1], dtype=factors.dtype)
+            tmp = np.empty_like(wilson)
+            for F in factors:
+                np.matmul(wilson, F, out=tmp)
+                wilson, tmp = tmp, wilson
+        else:
+            wilson = functools.reduce(np.dot, [polar_factor(O) for O in overlaps])
+        w = np.linalg.eigvals(wilson)
+        wcc = np.arctan2(w.imag, w.real)
+        wcc /= 2 * np.pi
+        np.remainder(wcc, 1, out=wcc)
+        wcc.sort()
+        return wcc
 
     def write_plotfile(self, filename='bands-tognuplot.dat'):
         """
@@ -809,25 +906,27 @@ class BandStructure:
         """
 
         kpline = self.KPOINTSline()
-
-        # Prepare energies at each k point
-        energies_expanded = np.full((self.num_bands, len(kpline)), np.inf)
+        num_bands = self.num_bands
+
+        # Prepare energies at each k point. table[iband] holds the columns
+        # of the block of a band: k and energy
+        table = np.empty((num_bands, len(kpline), 2))
+        table[:, :, 0] = kpline
+        energies_expanded = table[:, :, 1]
+        energies_expanded[:] = np.inf
         for ik, kp in enumerate(self.kpoints):
-            count = 0
-            for iset, deg in enumerate(kp.degeneracies):
-                for i in range(deg):
-                    energies_expanded[count,ik] = kp.Energy_mean[iset]
-                    count += 1
+            # each energy-level is repeated as many times as its degeneracy
+            E = np.repeat(kp.Energy_mean, kp.degeneracies)
+            energies_expanded[:len(E), ik] = E
 
         # Write energies of each band
-        file = open(filename, 'w')
-        file.write('column 1: k, column 2: energy in eV (w.r.t. Fermi level)')
-        for iband in range(self.num_bands):
-            file.write('\n')  # blank line separating blocks of k points
-            for k, energy in zip(kpline, energies_expanded[iband]):
-                s = '{:8.4f}    {:8.4f}\n'.format(k, energy)
-                file.write(s)
-        file.close()
+        buf = io.StringIO()
+        buf.write('column 1: k, column 2: energy in eV (w.r.t. Fermi level)')
+        for block in table:
+            buf.write('\n')  # blank line separating blocks of k points
+            np.savetxt(buf, block, fmt='%8.4f', delimiter='    ')
+        with open(filename, 'w') as file:
+            file.write(buf.getvalue())
 
     def KPOINTSline(self, kpred=None, supercell=None, breakTHRESH=0.1):
         """
@@ -857,14 +956,13 @@ class BandStructure:
             matches the number of k-points in the path.
         """
         if kpred is None:
-            kpred = [k.k for k in self.kpoints]
+            kpred = self._kpoints_direct()
         if supercell is None:
             reciprocal_lattice = self.RecLattice
         else:
             reciprocal_lattice = supercell.T @ self.RecLattice 
         KPcart = np.dot(kpred, reciprocal_lattice)
         K = np.zeros(KPcart.shape[0])
-        k = np.linalg.norm(KPcart[1:, :] - KPcart[:-1, :], axis=1)
-        k[k > breakTHRESH] = 0.0
-        K[1:] = np.cumsum(k)
+        k = np.linalg.norm(np.diff(KPcart, axis=0), axis=1)
+        np.cumsum(np.where(k > breakTHRESH, 0.0, k), out=K[1:])
         return K
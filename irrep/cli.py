@@ -22,9 +22,7 @@ Defines the command line interface to "irrep".
 import numpy as np
 
 import click
-from monty.serialization import dumpfn, loadfn
 
-from .bandstructure import BandStructure
 from .utility import str2list, short, log_message
 from . import __version__ as version
 
@@ -43,6 +41,7 @@ class LoadContextFromConfig(click.Command):
         if config_file is not None:
 
             # load from either a .yml or .json
+            from monty.serialization import loadfn
             config_data = loadfn(config_file)
 
             # sanitize inputs to be all lower-case
@@ -319,6 +318,10 @@ def cli(
     """
     # TODO: later, this can be split up into separate sub-commands (e.g. for zak, etc.)
 
+    # imported here rather than at module level to keep "irrep --help" fast
+    from monty.serialization import dumpfn
+    from .bandstructure import BandStructure
+
     # if supplied, convert refUC and shiftUC from comma-separated lists into arrays
     if refuc:
         refuc = np.array(refuc.split(","), dtype=float).reshape((3, 3))
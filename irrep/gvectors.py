@@ -16,6 +16,7 @@
 ##################################################################
 
 
+from functools import lru_cache
 import numpy as np
 import numpy.linalg as la
 from .readfiles import Hartree_eV
@@ -36,6 +37,60 @@ class NotSymmetryError(RuntimeError):
 twomhbar2 = 0.262465831
 
 
+@lru_cache(maxsize=None)
+def gvectors_shell(N):
+    """
+    Integer vectors G with :math:`|G_1|+|G_2|+|G_3|=N`, in the order in which 
+    they are visited by :func:`calc_gvectors`. The result does not depend on 
+    the k-point, so it is computed once and shared by all k-points.
+
+    Parameters
+    ----------
+    N : int
+        Index of the shell.
+
+    Returns
+    -------
+    array
+        Each row contains the direct coordinates of a vector in the shell. 
+        The array is read-only.
+    """
+    shell = []
+    for ig3 in range(-N, N + 1):
+        for ig2 in range(-(N - abs(ig3)), N - abs(ig3) + 1):
+            for ig1 in set([-(N - abs(ig3) - abs(ig2)), N - abs(ig3) - abs(ig2)]):
+                shell.append((ig1, ig2, ig3))
+    shell = np.array(shell, dtype=int)
+    shell.setflags(write=False)
+    return shell
+
+
+def energy_shells(E, thresh):
+    """
+    Find the shells of plane-waves with (nearly) the same energy.
+
+    Parameters
+    ----------
+    E : array
+        Energies of plane-waves, sorted in ascending order.
+    thresh : float
+        Plane-waves whose consecutive energies differ by less than `thresh` 
+        belong to the same shell.
+
+    Returns
+    -------
+    start : array
+        `start[i]` is the index of the first plane-wave in the shell of 
+        :math:`i^{th}` plane-wave.
+    end : array
+        `end[i]` is the index following the last plane-wave in the shell of 
+        :math:`i^{th}` plane-wave.
+    """
+    wall = np.hstack(([0], np.where(E[1:] - E[:-1] > thresh)[0] + 1, [len(E)]))
+    counts = np.diff(wall)
+    return np.repeat(wall[:-1], counts), np.repeat(wall[1:], counts)
+
+
 # This function is a python translation of a part of WaveTrans Code
 def calc_gvectors(
     K,
@@ -95,20 +150,19 @@ def calc_gvectors(
         Ecut1 = Ecut
     B = RecLattice
 
-    igp = np.zeros(3)
     igall = []
     Eg = []
+    ncnt = 0
     memory = np.full(10, True)
     for N in range(nplanemax):
-        flag = True
         if N % 10 == 0:
-            msg = f'Cycle {N:>3d}: number of plane waves = {len(igall):>10d}'
+            msg = f'Cycle {N:>3d}: number of plane waves = {ncnt:>10d}'
             log_message(msg, v, 2)
-        if len(igall) >= nplane / 2:    # Only enters if vasp
+        if ncnt >= nplane / 2:    # Only enters if vasp
             if spinor:
                 break
             else:      # Sure that not spinors?
-                if len(igall) >= nplane: # spinor=F, all plane waves found
+                if ncnt >= nplane: # spinor=F, all plane waves found
                     break
                 elif np.all(memory): # probably spinor wrong set as spinor=F
                     raise RuntimeError(
@@ -119,19 +173,17 @@ def calc_gvectors(
                           "set -spinor if it does.".format(Ecut)
                     )
 
-        for ig3 in range(-N, N + 1):
-            for ig2 in range(-(N - abs(ig3)), N - abs(ig3) + 1):
-                for ig1 in set([-(N - abs(ig3) - abs(ig2)), N - abs(ig3) - abs(ig2)]):
-                    igp = (ig1, ig2, ig3)
-                    etot = la.norm((K + np.array(igp)).dot(B)) ** 2 / twomhbar2
-                    if etot < Ecut:
-                        igall.append(igp)
-                        Eg.append(etot)
-                        flag = False
+        shell = gvectors_shell(N)
+        etot = la.norm((K + shell).dot(B), axis=1) ** 2 / twomhbar2
+        sel = etot < Ecut
+        nsel = np.count_nonzero(sel)
+        if nsel > 0:
+            igall.append(shell[sel])
+            Eg.append(etot[sel])
+            ncnt += nsel
         memory[:-1] = memory[1:]
-        memory[-1] = flag
+        memory[-1] = (nsel == 0)
 
-    ncnt = len(igall)
     if nplane < np.inf: # vasp
         if spinor:
             if 2 * ncnt != nplane:
@@ -147,12 +199,12 @@ def calc_gvectors(
                         ncnt, nplane
                     )
                 )
-    igall = np.array(igall, dtype=int)
+    igall = np.vstack(igall)
     ng = igall.max(axis=0) - igall.min(axis=0)
     igall1 = igall % ng[None, :]
     igallsrt = np.argsort((igall1[:, 2] * ng[1] + igall1[:, 1]) * ng[0] + igall1[:, 0])
     igall1 = igall[igallsrt]
-    Eg = np.array(Eg)[igallsrt]
+    Eg = np.hstack(Eg)[igallsrt]
     igall = np.zeros((ncnt, 6), dtype=int)
     igall[:, :3] = igall1
     igall[:, 3] = np.arange(ncnt)
@@ -161,10 +213,7 @@ def calc_gvectors(
     srt = np.argsort(Eg)
     Eg = Eg[srt]
     igall = igall[srt, :].T
-    wall = [0] + list(np.where(Eg[1:] - Eg[:-1] > thresh)[0] + 1) + [igall.shape[1]]
-    for i in range(len(wall) - 1):
-        igall[4, wall[i] : wall[i + 1]] = wall[i]
-        igall[5, wall[i] : wall[i + 1]] = wall[i + 1]
+    igall[4], igall[5] = energy_shells(Eg, thresh)
     #    print ("K={0}\n E={1}\nigall=\n{2}".format(K,Eg,igall.T))
     return igall
 
@@ -236,12 +285,7 @@ def sortIG(ik, kg, kpt, CG, RecLattice, Ecut0, Ecut, spinor):
     igall = np.zeros((6, len(sel)), dtype=int)
     igall[:3, :] = kg[srt].T
     igall[3, :] = srt
-    wall = (
-        [0] + list(np.where(eKG[1:] - eKG[:-1] > thresh)[0] + 1) + [igall.shape[1]]
-    )
-    for i in range(len(wall) - 1):
-        igall[4, wall[i] : wall[i + 1]] = wall[i]
-        igall[5, wall[i] : wall[i + 1]] = wall[i + 1]
+    igall[4], igall[5] = energy_shells(eKG, thresh)
 
     if spinor:
         CG = CG[:, np.hstack((sel[srt], sel[srt] + npw))]
@@ -16,6 +16,7 @@
 ##################################################################
 
 
+import io
 from functools import lru_cache
 import numpy as np
 import numpy.linalg as la
@@ -98,7 +99,8 @@ class Kpoint:
         the unit-cell in reciprocal space.
     WF : array
         Coefficients of wave-functions in the plane-wave expansion. A row for 
-        each wave-function, a column for each plane-wave.
+        each wave-function, a column for each plane-wave. It may be a view 
+        into the buffer of coefficients of `BandStructure`, it is not copied.
     ig : array
         Returned by `sortIG`.
         Every column corresponds to a plane-wave of energy smaller than 
@@ -492,7 +494,7 @@ class Kpoint:
             log_message(msg, v, 1)
             msg = (f"Printing matrix of symmetry at k={self.k}")
             log_message(msg, v, 1)
-            log_message(format_matrix(Sblock), v, 1)
+            log_message(lambda: format_matrix(Sblock), v, 1)
 
         # Calculate eigenvalues and eigenvectors in each block
         eigenvalues = []
@@ -517,7 +519,7 @@ class Kpoint:
 
         # Check unitarity of the symmetry
         if np.abs((np.abs(w) - 1.0)).max() > 1e-4:
-            log_message(f"WARNING: some eigenvalues are not unitary: {w}",v,1)
+            log_message(lambda: f"WARNING: some eigenvalues are not unitary: {w}",v,1)
         if np.abs((np.abs(w) - 1.0)).max() > 3e-1:
             raise RuntimeError(" some eigenvalues are not unitary :{0} ".format(w))
         w /= np.abs(w)
@@ -901,14 +903,17 @@ class Kpoint:
         res = ("{0} \n {1} \n".format(len(self.little_group), "  ".join(str(x) for x in indices)))
 
         IB = np.cumsum(np.hstack(([0], self.degeneracies[:-1]))) + 1
-        res += (
-            "\n".join(
-                (" {ib:8d}  {d:8d}   {E:8.4f} ").format(E=e, d=d, ib=ib)
-                + "  ".join("{0:10.6f}   {1:10.6f} ".format(c.real, c.imag) for c in ch)
-                for e, d, ib, ch in zip(self.Energy_mean, self.degeneracies, IB, self.char)
-            )
-            + "\n"
-        )
+        nsym = self.char.shape[1]
+        table = np.zeros((len(IB), 3 + 2 * nsym))
+        table[:, 0] = IB
+        table[:, 1] = self.degeneracies
+        table[:, 2] = self.Energy_mean
+        table[:, 3::2] = self.char.real
+        table[:, 4::2] = self.char.imag
+        fmt = " %8d  %8d   %8.4f " + "  ".join(["%10.6f   %10.6f "] * nsym)
+        buf = io.StringIO()
+        np.savetxt(buf, table, fmt=fmt)
+        res += buf.getvalue()
 
         return res
 
@@ -931,27 +936,22 @@ class Kpoint:
         igmax = igall.max(axis=1)
         igmin = igall.min(axis=1)
         igsize = igmax - igmin + 1
-        #        print (self.ig.T)
-        #        print (igsize)
+        # flat indices of plane waves in the box containing both sets
+        ind1 = np.ravel_multi_index(self.ig[:3] - igmin[:, None], igsize)
+        ind2 = np.ravel_multi_index(other.ig[:3] - g[:, None] - igmin[:, None], igsize)
+        # only plane waves present in both expansions contribute
+        _, sel1, sel2 = np.intersect1d(ind1, ind2, assume_unique=True,
+                                       return_indices=True)
+        ng1 = self.ig.shape[1]
+        ng2 = other.ig.shape[1]
         res = np.zeros((self.num_bands, other.num_bands), dtype=complex)
         
-        # short again coefficients of expansions
+        # coefficients are gathered in the precision they are stored in and
+        # promoted to double only to accumulate the products
         for s in [0, 1] if self.spinor else [0]:
-            WF1 = np.zeros((self.num_bands, igsize[0], igsize[1], igsize[2]), dtype=complex)
-            WF2 = np.zeros(
-                (other.num_bands, igsize[0], igsize[1], igsize[2]), dtype=complex
-            )
-            for i, ig in enumerate(self.ig.T):
-                WF1[:, ig[0] - igmin[0], ig[1] - igmin[1], ig[2] - igmin[2]] = self.WF[
-                    :, i + s * self.ig.shape[1]
-                ]
-            for i, ig in enumerate(other.ig[:3].T - g[None, :]):
-                WF2[:, ig[0] - igmin[0], ig[1] - igmin[1], ig[2] - igmin[2]] = other.WF[
-                    :, i + s * other.ig.shape[1]
-                ]
-            res += np.einsum("mabc,nabc->mn", WF1.conj(), WF2)
-        #        return np.einsum("mabc,nabc->mn",WF1.conj(),WF2)
-        #        return np.einsum("ma,na->mn",self.WF.conj(),other.WF)
+            WF1 = self.WF[:, sel1 + s * ng1].astype(complex)
+            WF2 = other.WF[:, sel2 + s * ng2].astype(complex)
+            res += WF1.conj() @ WF2.T
         return res
 
     def getloc1(self, loc):
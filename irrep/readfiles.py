@@ -16,6 +16,7 @@
 ##################################################################
 
 
+import os
 import numpy as np
 import scipy
 from scipy.io import FortranFile as FF
@@ -24,6 +25,14 @@ from .utility import FortranFileR as FFR
 from .utility import str2bool, BOHR, split, log_message
 import xml.etree.ElementTree as ET
 
+try:
+    from scipy.fft import fftn as _fftn
+
+    def fftn(a, axes=None):
+        return _fftn(a, axes=axes, overwrite_x=True)
+except ImportError:  # scipy < 1.4
+    from numpy.fft import fftn
+
 Rydberg_eV = 13.605693  # eV
 Hartree_eV = 2 * Rydberg_eV
 
@@ -45,10 +54,13 @@ class WAVECARFILE:
         Corresponds to `fname`.
     rl : int
         Equal to parameter `RL`.
+    mm : np.memmap
+        Byte-level memory map of the file. Records are read from it.
     """
 
     def __init__(self, filename, RL=3):
         self.f = open(filename, "rb")
+        self.mm = np.memmap(self.f, dtype=np.uint8, mode="r")
         self.rl = 3
         # RECLENGTH=3 # the length of a record in WAVECAR. It is defined in the
         # first record, so let it be 3 fo far"
@@ -63,8 +75,26 @@ class WAVECARFILE:
 
     def record(self, irec, cnt=np.inf, dtype=float):
         """An auxilary function to get records from WAVECAR"""
-        self.f.seek(irec * self.rl)
-        return np.fromfile(self.f, dtype=dtype, count=min(self.rl, cnt))
+        dtype = np.dtype(dtype)
+        start = irec * self.rl
+        end = min(start + int(min(self.rl, cnt)) * dtype.itemsize, self.mm.size)
+        end -= (end - start) % dtype.itemsize
+        return self.mm[start:end].view(dtype).copy()
+
+    def records(self, irec, nrec, cnt, dtype=np.complex64):
+        """
+        Memory-mapped view of `nrec` consecutive records starting at `irec`.
+        Each row holds the first `cnt` elements of a record. Nothing is 
+        read from disk until the elements are accessed, but the kernel is 
+        asked to start reading the whole block ahead asynchronously.
+        """
+        dtype = np.dtype(dtype)
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(self.f.fileno(), irec * self.rl, nrec * self.rl,
+                             os.POSIX_FADV_WILLNEED)
+        return np.ndarray(shape=(nrec, cnt), dtype=dtype, buffer=self.mm,
+                          offset=irec * self.rl,
+                          strides=(self.rl, dtype.itemsize))
 
 
 def record_abinit(fWFK, st):
@@ -90,6 +120,64 @@ def record_abinit(fWFK, st):
 
 
 
+def complex_record(record):
+    """
+    Reinterpret a record of interleaved real and imaginary parts as an 
+    array of complex numbers, without copying.
+
+    Parameters
+    ----------
+    record : array
+        Record of `float64` numbers. Elements with even (odd) index are 
+        real (imaginary) parts.
+
+    Returns
+    -------
+    array
+        View of `record` as `complex128`, keeping its byte order.
+    """
+    record = np.ascontiguousarray(record)
+    return record.view(np.dtype(complex).newbyteorder(record.dtype.byteorder))
+
+
+def complex_records(f, count, size):
+    """
+    Read in a single call `count` consecutive records of a Fortran file, 
+    each holding `size` complex numbers as interleaved real and imaginary 
+    parts.
+
+    Parameters
+    ----------
+    f : class
+        Instance of `scipy.io.FortranFile`.
+    count : int
+        Number of records.
+    size : int
+        Number of complex numbers in each record.
+
+    Returns
+    -------
+    array, shape=(count, size)
+        Each row contains the data of a record.
+
+    Raises
+    ------
+    RuntimeError
+        The file does not contain the expected records.
+    """
+    record = np.dtype([("head", f._header_dtype),
+                       ("data", "f8", (2 * size,)),
+                       ("tail", f._header_dtype)])
+    data = np.fromfile(f._fp, dtype=record, count=count)
+    if (len(data) != count
+            or np.any(data["head"] != 16 * size)
+            or np.any(data["tail"] != 16 * size)):
+        raise RuntimeError(
+            "file {} does not contain {} records of {} coefficients"
+            .format(f._fp.name, count, size))
+    return complex_record(data["data"])
+
+
 class ParserAbinit():
     """
     Parse header of the WFK file of Abinit.
@@ -113,6 +201,11 @@ class ParserAbinit():
         Each element is the number of plane waves used at a k-point
     kpt : array
         Each row contains the coordinates of a k-point in the DFT BZ
+    kpt_count : int
+        Index of the next k-point block in the file.
+    kpt_offsets : dict
+        Position in the file of the blocks of k-points already visited, 
+        with the index of the k-point as key.
 
     Notes
     -----
@@ -125,6 +218,7 @@ class ParserAbinit():
         #fWFK = FF(fname, "r")
         self.fWFK = FFR(filename)  # temporary
         self.kpt_count = 0  # index of the next k-point to be read
+        self.kpt_offsets = {}  # position in the file of each k-point's block
 
     def parse_header(self, v=0):
         '''
@@ -319,8 +413,14 @@ class ParserAbinit():
 
         nspinor = 2 if self.spinor else 1
 
+        # Go back to the block of ik if it was already visited
+        if ik in self.kpt_offsets:
+            self.fWFK._fp.seek(self.kpt_offsets[ik])
+            self.kpt_count = ik
+
         # We need to skip lines in fWFK until we reach the lines of ik
         for i in range(self.kpt_count, ik+1):
+            self.kpt_offsets[i] = self.fWFK._fp.tell()
 
             if self.kpt_count < ik:
                 skip = True
@@ -330,33 +430,43 @@ class ParserAbinit():
             # 1st record: npw, nspinor, nband
             record = record_abinit(self.fWFK, "i4")  # [0]
             npw, nspinor_loc, nband = record
-            assert npw == self.npwarr[ik], ("Different number of plane waves "
-                                            "in header and k-point's block. "
-                                            "Probably a bug in Abinit...")
+            assert npw == self.npwarr[i], ("Different number of plane waves "
+                                           "in header and k-point's block. "
+                                           "Probably a bug in Abinit...")
             assert nspinor_loc == nspinor, ("Different values of nspinor in "
                                             "header and k-point's block. "
                                             "Probably a bug in Abinit...")
-            assert nband == self.nband[ik], ("Different number of bands in "
-                                             "header and k-point's block. "
-                                             "Probably a bug in Abinit...")
-
-            # 2nd record: reciprocal lattice vectors in the expansion
-            kg = record_abinit(self.fWFK, "i4").reshape(npw, 3)
-
-            # 3rd record: energies and occupations
-            record = record_abinit(self.fWFK, "f8")
-            if not skip:
-                eigen = record[:nband]
-                eigen *= Hartree_eV
+            assert nband == self.nband[i], ("Different number of bands in "
+                                            "header and k-point's block. "
+                                            "Probably a bug in Abinit...")
 
-            # 4th record: coefficients of expansions in plane waves
+            # Records of k-points before ik are skipped without reading them:
+            # plane waves, energies and a record per band for coefficients
             if skip:
-                record = record_abinit(self.fWFK, "f8")
-            else:
-                CG = np.zeros((nband, npw * nspinor), dtype=complex)
-                for iband in range(nband):
-                    record = record_abinit(self.fWFK, "f8")
-                    CG[iband] = record[0::2] + 1.0j * record[1::2]
+                self.fWFK.skip_record(2 + nband)
+                self.kpt_count += 1
+                continue
+
+            # Remaining records: reciprocal lattice vectors in the expansion,
+            # energies and occupations, and coefficients of expansions in
+            # plane waves (a record per band). Read in one go if the
+            # record of energies has the expected length
+            start = self.fWFK._fp.tell()
+            try:
+                block = self.fWFK.read_block(
+                    [("kg", "i4", 1, (npw, 3)),
+                     ("eigen", "f8", 1, (2 * nband,)),
+                     ("CG", complex, nband, (npw * nspinor,))]
+                )
+                kg = block["kg"][0]
+                eigen = block["eigen"][0, :nband]
+                CG = block["CG"]
+            except RuntimeError:
+                self.fWFK._fp.seek(start)
+                kg = record_abinit(self.fWFK, "i4").reshape(npw, 3)
+                eigen = record_abinit(self.fWFK, "f8")[:nband]
+                CG = self.fWFK.read_records(complex, nband, npw * nspinor)
+            eigen *= Hartree_eV
 
             self.kpt_count += 1
 
@@ -418,42 +528,40 @@ class ParserVasp:
 
         msg = f'Reading POSCAR: {self.fPOS}'
         log_message(msg, v, 1)
-        fpos = (l.strip() for l in open(self.fPOS))
+        with open(self.fPOS) as f:
+            fpos = iter(f.read().splitlines())
         title = next(fpos)  # title
         del title
-        lattice = float(
-            next(fpos)) * np.array([next(fpos).split() for i in range(3)], dtype=float)
+        scale = float(next(fpos))
+        lattice = scale * np.loadtxt(fpos, max_rows=3, usecols=(0, 1, 2),
+                                     dtype=float, ndmin=2)
         try:
             nat = np.array(next(fpos).split(), dtype=int)
-        except BaseException:
+        except ValueError:  # line with names of species (VASP 5)
             nat = np.array(next(fpos).split(), dtype=int)
 
         typat = [i + 1 for i in range(len(nat)) for j in range(nat[i])]
 
-        l = next(fpos)
+        l = next(fpos).strip()
         if l[0] in ['s', 'S']:
-            l = next(fpos)
+            l = next(fpos).strip()
         cartesian=False
         if l[0].lower()=='c':
             cartesian=True
         elif l[0].lower()!='d':
             raise RuntimeError(
                 'only "direct" or "cartesian"atomic coordinates are supproted')
-        positions = np.zeros((np.sum(nat), 3))
-        i = 0
-        for l in fpos:
-            if i >= sum(nat):
-                break
-            try:
-                positions[i] = np.array(l.split()[:3])
-                i += 1
-            except Exception as err:
-                log_message(err, msg, 1)
-                pass
-        if sum(nat) != i:
+        nat_tot = int(np.sum(nat))
+        try:
+            positions = np.loadtxt(fpos, max_rows=nat_tot, usecols=(0, 1, 2),
+                                   dtype=float, ndmin=2)
+        except ValueError as err:
+            raise RuntimeError(
+                f"failed to read atomic positions from {self.fPOS}: {err}")
+        if positions.shape[0] != nat_tot:
             raise RuntimeError(
                 "not all atomic positions were read : {0} of {1}".format(
-                    i, sum(nat)))
+                    positions.shape[0], nat_tot))
         if cartesian:
             positions = positions.dot(np.linalg.inv(lattice))
         return lattice, positions, typat
@@ -496,6 +604,8 @@ class ParserVasp:
 
         Returns
         -------
+        WF : array
+            Coefficients of wave functions
         Energy : array
             Energy levels. Degenerate levels are repeated
         kpt : array
@@ -504,8 +614,36 @@ class ParserVasp:
         npw : int
             Number of plane waves in the expansion of wave functions
         '''
+        Energy, kpt, npw = self.parse_kpoint_header(ik, NBin, spinor)
+        WF = self.parse_wf(ik, NBin, npw)
+        return WF, Energy, kpt, npw
+
+    def parse_kpoint_header(self, ik, NBin, spinor):
+        '''
+        Parse energies, coordinates and number of plane waves of a k-point 
+        from WAVECAR, without reading the coefficients
 
-        r = self.fWAV.record(2 + ik * (NBin + 1))
+        Parameters
+        ----------
+        ik : int
+            Index of the k-point
+        NBin : int
+            Number of bands
+        spinor : bool
+            Whether wave functions are spinors (SOC)
+
+        Returns
+        -------
+        Energy : array
+            Energy levels. Degenerate levels are repeated
+        kpt : array
+            Direct coords of the k-points with respect to the basis vectors 
+            of the DFT reciprocal space cell
+        npw : int
+            Number of plane waves in the expansion of wave functions
+        '''
+
+        r = self.fWAV.record(2 + ik * (NBin + 1), 4 + NBin * 3)
 
         # Check if number of plane waves is even for spinors
         npw = int(r[0])
@@ -514,10 +652,38 @@ class ParserVasp:
                                "wavefunctions".format(npw))
         kpt = r[1:4]
         Energy = np.array(r[4 : 4 + NBin * 3]).reshape(NBin, 3)[:, 0]
-        WF = np.zeros((NBin, npw), dtype=np.complex64)
-        for ib in range(NBin):
-            WF[ib] = self.fWAV.record(3 + ik * (NBin + 1) + ib, npw, np.complex64)
-        return WF, Energy, kpt, npw
+        return Energy, kpt, npw
+
+    def parse_wf(self, ik, NBin, npw, bands=slice(None), selectG=None):
+        '''
+        Parse the coefficients of wave functions of a k-point from WAVECAR. 
+        They are gathered from a memory map of the file, so bands and plane 
+        waves which are not selected are not read
+
+        Parameters
+        ----------
+        ik : int
+            Index of the k-point
+        NBin : int
+            Number of bands in the file
+        npw : int
+            Number of plane waves, as returned by :func:`parse_kpoint_header`
+        bands : slice, default=slice(None)
+            Bands to read
+        selectG : array, default=None
+            Indices of the plane-wave coefficients to read. All of them are 
+            read if `None`
+
+        Returns
+        -------
+        WF : array
+            Each row contains the selected coefficients of a wave function
+        '''
+        WF = self.fWAV.records(3 + ik * (NBin + 1), NBin, npw, np.complex64)
+        WF = WF[bands]
+        if selectG is None:
+            return np.array(WF)
+        return np.take(WF, selectG, axis=1)
 
 class ParserEspresso:
     '''
@@ -539,6 +705,9 @@ class ParserEspresso:
     bandstructure : class
         Instance of `Element` in the ElementTree XML API corresponding 
         to tag `band_structure` in `data-file-schema.xml` file
+    ks_energies : list
+        Elements corresponding to tags `ks_energies` (one per k-point) in 
+        `band_structure`
     spinor : bool
         Whether wave functions are spinors (SOC)
     '''
@@ -551,6 +720,7 @@ class ParserEspresso:
         self.input = myroot.find("input")
         outp = myroot.find("output")
         self.bandstr = outp.find("band_structure")
+        self.ks_energies = self.bandstr.findall("ks_energies")
 
         # todo: define spinor as property with getter
         self.spinor = str2bool(self.bandstr.find("noncolin").text)
@@ -580,7 +750,7 @@ class ParserEspresso:
 
         Ecut0 = float(self.input.find("basis").find("ecutwfc").text)
         Ecut0 *= Hartree_eV
-        NK = len(self.bandstr.findall("ks_energies"))
+        NK = len(self.ks_energies)
 
         # Parse number of bands
         try:
@@ -627,20 +797,25 @@ class ParserEspresso:
         struct = self.input.find("atomic_structure")
         nat = int(struct.attrib["nat"])
         alat = float(struct.attrib["alat"])
-        del nat
 
         # Parse lattice vectors
-        lattice = []
-        for i in range(3):
-            lattice.append(struct.find("cell").find("a{}".format(i + 1)).text.strip().split())
-        lattice = BOHR * np.array(lattice, dtype=float)
+        cell = struct.find("cell")
+        lattice = " ".join(cell.find("a{}".format(i + 1)).text for i in range(3))
+        lattice = np.fromstring(lattice, dtype=float, sep=" ")
+        if lattice.size != 9:
+            raise RuntimeError("Could not parse the lattice vectors in "
+                               "data-file-schema.xml")
+        lattice = BOHR * lattice.reshape(3, 3)
 
         # Parse atomic positions in cartesian coordinates
-        positions = []
-        for at in struct.find("atomic_positions").findall("atom"):
-            positions.append(at.text.split())
-        positions = np.dot(np.array(positions, dtype=float)*BOHR,
-                      np.linalg.inv(lattice))
+        positions = " ".join(at.text for at in
+                             struct.find("atomic_positions").findall("atom"))
+        positions = np.fromstring(positions, dtype=float, sep=" ")
+        if positions.size != 3 * nat:
+            raise RuntimeError("Could not parse the positions of {} atoms in "
+                               "data-file-schema.xml".format(nat))
+        positions = positions.reshape(nat, 3)
+        positions = np.dot(positions * BOHR, np.linalg.inv(lattice))
 
         # Parse indices denoting type of atom
         atnames = []
@@ -687,10 +862,15 @@ class ParserEspresso:
             Verbosity level. Default set to minimalistic printing
         '''
 
-        kptxml = self.bandstr.findall("ks_energies")[ik]
+        kptxml = self.ks_energies[ik]
 
         # Parse energy levels
-        Energy = np.array(kptxml.find("eigenvalues").text.split(), dtype=float)
+        eigenvalues = kptxml.find("eigenvalues")
+        Energy = np.fromstring(eigenvalues.text, dtype=float, sep=" ")
+        nE = int(eigenvalues.attrib.get("size", NBin))
+        if Energy.size != nE:
+            raise RuntimeError("Could not parse {} eigenvalues at k-point {} "
+                               "in data-file-schema.xml".format(nE, ik + 1))
         Energy *= Hartree_eV
 
         # Open file with the wave functions
@@ -719,10 +899,8 @@ class ParserEspresso:
         npwtot = npw * (2 if self.spinor else 1)
         msg = 'npwtot: {}, igwx: {}'.format(npwtot, igwx)
         log_message(msg, v, 2)
-        WF = np.zeros((NBin, npwtot), dtype=complex)
-        for ib in range(NBin):
-            rec = record_abinit(fWFC, "{}f8".format(npwtot * 2))
-            WF[ib] = rec[0::2] + 1.0j * rec[1::2]
+        WF = complex_records(fWFC, NBin, npwtot)
+        fWFC.close()
 
         return WF, Energy, kg, kpt
 
@@ -745,18 +923,26 @@ class ParserW90:
     fwin : list
         Each element is a list of a non-comment line in `wannier90.win` file,
         split by blank spaces
-    ind : list
-        Each element is the first keyword of a line in `wannier90.win`
-    iterwin : iterator object
-        Iterator object for attribute `fwin`
+    ind : dict
+        Indices in `fwin` of the lines starting with each keyword of 
+        `wannier90.win`
+    blocks : dict
+        For each name of a `begin ... end` block in `wannier90.win`, list 
+        of spans `(start, end)` such that `fwin[start:end]` are the lines 
+        inside the block and `fwin[end]` should close it
     NBin : int
         Number of DFT bands
     spinor : bool
         Whether wave functions are spinors (SOC)
     NK : int
         Number of k-points in DFT calculation
+    fft_batch_size : int
+        Maximal number of grid points (of all bands and spinor components) 
+        transformed in a single FFT call
     '''
 
+    fft_batch_size = 2 ** 18
+
     def __init__(self, prefix):
 
         self.prefix = prefix
@@ -766,8 +952,17 @@ class ParserW90:
             for l in self.fwin
             if len(l) > 0 and l[0] not in ("!", "#")
         ]
-        self.ind = np.array([l[0] for l in self.fwin])
-        self.iterwin = iter(self.fwin)
+        self.ind = {}
+        for i, l in enumerate(self.fwin):
+            self.ind.setdefault(l[0], []).append(i)
+        self.blocks = {}
+        begin = None
+        for i, l in enumerate(self.fwin + [["end"]]):
+            if l[0].startswith("begin") or (l[0] == "end" and begin is not None):
+                if begin is not None:
+                    name = self.fwin[begin][1]
+                    self.blocks.setdefault(name, []).append((begin + 1, i))
+                begin = i if l[0].startswith("begin") else None
 
     def parse_header(self):
         '''
@@ -813,76 +1008,51 @@ class ParserW90:
             Each row contains the direct coords of a k-point in the DFT cell
         '''
 
-        # Initialize quantities to make sure they aren't twice in .win
+        # Parse lattice vectors
+        L = self.get_block("unit_cell_cart")
         lattice = None
+        if L is not None:
+            units = "ang"
+            if len(L) > 0 and L[0][0] in ("bohr", "ang"):
+                units = L[0][0]
+                L = L[1:]
+            if len(L) != 3:
+                raise RuntimeError(
+                    "expected 3 lattice vectors in block unit_cell_cart of "
+                    "{}.win, found {}".format(self.prefix, len(L)))
+            lattice = np.array(L, dtype=float)
+            if units == "bohr":
+                lattice *= BOHR
+
+        # Parse k-points
+        K = self.get_block("kpoints")
         kpred = None
-        found_atoms = False
-
-        for l in self.iterwin:
-
-            if l[0].startswith("begin"):
-
-                # Parse lattice vectors
-                if l[1] == "unit_cell_cart":
-                    if lattice is not None:
-                        raise RuntimeError(
-                            "'begin unit_cell_cart' found more then once  in {}.win".format(
-                                self.prefix
-                            ))
-                    l1 = next(self.iterwin)
-                    if l1[0] in ("bohr", "ang"):
-                        units = l1[0]
-                        L = [next(self.iterwin) for i in range(3)]
-                    else:
-                        units = "ang"
-                        L = [l1] + [next(self.iterwin) for i in range(2)]
-                    lattice = np.array(L, dtype=float)
-                    if units == "bohr":
-                        lattice *= BOHR
-                    self.check_end("unit_cell_cart")
-
-                # Parse k-points
-                elif l[1] == "kpoints":
-                    if kpred is not None:
-                        raise RuntimeError(
-                            "'begin kpoints' found more then once  in {}.win".format(
-                                self.prefix
-                            ))
-                    kpred = np.zeros((self.NK, 3), dtype=float)
-                    for i in range(self.NK):
-                        kpred[i] = next(self.iterwin)[:3]
-                    self.check_end("kpoints")
-
-                # Parse atomic positions
-                elif l[1].startswith("atoms_"):
-                    if l[1][6:10] not in ("cart", "frac"):
-                        raise RuntimeError("unrecognised block :  '{}' ".format(l[0]))
-                    if found_atoms:
-                        raise RuntimeError(
-                            "'begin atoms_***' found more then once  in {}.win".format(
-                                self.prefix
-                            ))
-                    found_atoms = True
-                    positions = []
-                    nameat = []
-                    while True:
-                        l1 = next(self.iterwin)
-                        if l1[0] == "end":
-                            if l1[1] != l[1]:
-                                raise RuntimeError(
-                                    "'{}' ended with 'end {}'".format(
-                                        " ".join(l), l1[1]
-                                    )
-                                )
-                            else:
-                                break
-                        nameat.append(l1[0])
-                        positions.append(l1[1:4])
-                    typatdic = {n: i + 1 for i, n in enumerate(set(nameat))}
-                    typat = [typatdic[n] for n in nameat]
-                    positions = np.array(positions, dtype=float)
-                    if l[1][6:10] == "cart":  # from cartesian to direct coords
-                        positions = positions.dot(np.linalg.inv(lattice))
+        if K is not None:
+            if len(K) != self.NK:
+                raise RuntimeError(
+                    "expected {} k-points in block kpoints of {}.win, found {}"
+                    .format(self.NK, self.prefix, len(K)))
+            kpred = np.array([k[:3] for k in K], dtype=float)
+
+        # Parse atomic positions
+        atoms = [name for name in self.blocks if name.startswith("atoms_")]
+        if len(atoms) == 0:
+            raise RuntimeError(
+                "'begin atoms_***' not found in {}.win".format(self.prefix))
+        if len(atoms) > 1:
+            raise RuntimeError(
+                "'begin atoms_***' found more then once  in {}.win".format(
+                    self.prefix
+                ))
+        if atoms[0][6:10] not in ("cart", "frac"):
+            raise RuntimeError("unrecognised block :  '{}' ".format(atoms[0]))
+        A = self.get_block(atoms[0])
+        nameat = [a[0] for a in A]
+        typatdic = {n: i + 1 for i, n in enumerate(set(nameat))}
+        typat = [typatdic[n] for n in nameat]
+        positions = np.array([a[1:4] for a in A], dtype=float)
+        if atoms[0][6:10] == "cart":  # from cartesian to direct coords
+            positions = positions.dot(np.linalg.inv(lattice))
 
         return lattice, positions, typat, kpred
 
@@ -903,17 +1073,13 @@ class ParserW90:
         try:
             if Energy.shape[0] != self.NBin * self.NK:
                 raise RuntimeError("wrong number of entries ")
-            ik = np.array(Energy[:, 1]).reshape(self.NK, self.NBin)
-            if not np.all(
-                ik == np.arange(1, self.NK + 1)[:, None] * np.ones(self.NBin, dtype=int)[None, :]
-            ):
+            Energy = Energy.reshape(self.NK, self.NBin, -1)
+            # bands run fastest, both indices start at 1
+            if not np.all(Energy[:, :, 1] == np.arange(1, self.NK + 1)[:, None]):
                 raise RuntimeError("wrong k-point indices")
-            ib = np.array(Energy[:, 0]).reshape(self.NK, self.NBin)
-            if not np.all(
-                ib == np.arange(1, self.NBin + 1)[None, :] * np.ones(self.NK, dtype=int)[:, None]
-            ):
+            if not np.all(Energy[:, :, 0] == np.arange(1, self.NBin + 1)):
                 raise RuntimeError("wrong band indices")
-            Energy = Energy[:, 2].reshape(self.NK, self.NBin)
+            Energy = Energy[:, :, 2]
         except Exception as err:
             raise RuntimeError(" error reading {} : {}".format(feig,err))
         return Energy
@@ -954,20 +1120,24 @@ class ParserW90:
                 "file {} contains {} bands , expected {}".format(fname, nbnd, self.NBin)
             )
 
-        # Parse WF coefficients
+        # The grids are read and transformed in batches of bands, which
+        # bounds the memory taken by the grids and their transforms. Each
+        # grid is stored in Fortran order, i.e. as a C-ordered
+        # (ngz, ngy, ngx) array
+        selectG = np.ravel_multi_index(tuple(selectG), (ngx, ngy, ngz),
+                                       mode="wrap", order="F")
+        nbatch = max(1, self.fft_batch_size // (nspinor * ngtot))
         WF = []
-        for ib in range(self.NBin):
-            WF_tmp = []
-            for i in range(nspinor):
-                cg_tmp = record_abinit(fUNK, "{}f8".format(ngtot * 2))
-                cg_tmp = (cg_tmp[0::2] + 1.0j * cg_tmp[1::2]).reshape(
-                    (ngx, ngy, ngz), order="F")
-                cg_tmp = np.fft.fftn(cg_tmp)
-                WF_tmp.append(cg_tmp[selectG])
-            WF.append(np.hstack(WF_tmp))
-
-        WF = np.array(WF)
-        return WF
+        for ib in range(0, self.NBin, nbatch):
+            nb = min(nbatch, self.NBin - ib)
+            grids = complex_records(fUNK, nb * nspinor, ngtot)
+            grids = fftn(grids.reshape(nb, nspinor, ngz, ngy, ngx),
+                         axes=(2, 3, 4))
+            WF.append(np.take(grids.reshape(nb, nspinor, ngtot), selectG,
+                              axis=2))
+        fUNK.close()
+        WF = np.concatenate(WF)
+        return WF.reshape(self.NBin, nspinor * len(selectG))
 
     def parse_grid(self, ik):
         '''
@@ -995,7 +1165,39 @@ class ParserW90:
         fUNK.close()
         return ngx, ngy, ngz
 
-    def check_end(self, name):
+    def get_block(self, name):
+        """
+        Return the lines inside a `begin ... end` block of .win file.
+
+        Parameters
+        ----------
+        name : str
+            Name of the block in .win file.
+
+        Returns
+        -------
+        list
+            Lines inside the block, split by blank spaces. `None` if the 
+            block is not found.
+
+        Raises
+        ------
+        RuntimeError
+            Block is found more than once or it is not closed.
+        """
+        spans = self.blocks.get(name, [])
+        if len(spans) == 0:
+            return None
+        if len(spans) > 1:
+            raise RuntimeError(
+                "'begin {}' found more then once  in {}.win".format(
+                    name, self.prefix
+                ))
+        start, end = spans[0]
+        self.check_end(name, end)
+        return self.fwin[start:end]
+
+    def check_end(self, name, end):
         """
         Check if block in .win file is closed.
 
@@ -1003,16 +1205,18 @@ class ParserW90:
         ----------
         name : str
             Name of the block in .win file.
+        end : int
+            Index in `fwin` of the line that should close the block.
         
         Raises
         ------
         RuntimeError
             Block is not closed.
         """
-        s = next(self.iterwin)
-        if " ".join(s) != "end " + name:
+        s = " ".join(self.fwin[end]) if end < len(self.fwin) else "end of file"
+        if s != "end " + name:
             raise RuntimeError(
-                "expected 'end {}, found {}'".format(name, " ".join(s))
+                "expected 'end {}, found {}'".format(name, s)
             )
 
 
@@ -1048,7 +1252,7 @@ class ParserW90:
             once or its value is formed by many elements but it is not
             `mpgrid`.
         """
-        i = np.where(self.ind == key)[0]
+        i = self.ind.get(key, [])
         if len(i) == 0:
             if default is None:
                 raise RuntimeError(
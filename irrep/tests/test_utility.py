@@ -0,0 +1,73 @@
+import numpy as np
+from irrep.utility import leading_minors, polar_factor
+
+
+def random_matrices(shape, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=shape) + 1j * rng.normal(size=shape)
+
+
+def det_minors(A):
+    """Leading principal minors from numpy.linalg.det"""
+    N = A.shape[-1]
+    return np.stack([np.linalg.det(A[..., :n, :n]) for n in range(1, N + 1)],
+                    axis=-1)
+
+
+def test_leading_minors():
+    A = random_matrices((4, 6, 6))
+    assert np.allclose(leading_minors(A), det_minors(A), rtol=1e-10, atol=0)
+
+
+def test_leading_minors_small_pivot():
+    # Tiny (but nonzero) and vanishing leading elements make elimination
+    # without pivoting inaccurate. The result must still match det
+    A = random_matrices((3, 5, 5), seed=1)
+    A[0, 0, 0] = 1e-12
+    A[1, 1, 1] = A[1, 1, 0] * A[1, 0, 1] / A[1, 0, 0]
+    ref = det_minors(A)
+    minors = leading_minors(A)
+    assert np.all(np.isfinite(minors))
+    assert np.allclose(minors, ref, rtol=1e-8, atol=1e-14)
+
+
+def svd_polar_factor(A):
+    U, _, Vh = np.linalg.svd(A, full_matrices=False)
+    return U @ Vh
+
+
+def check_polar_factor(A):
+    P = polar_factor(A)
+    assert P.shape == A.shape
+    assert np.allclose(P, svd_polar_factor(A), rtol=0, atol=1e-10)
+
+
+def test_polar_factor_square():
+    check_polar_factor(random_matrices((3, 6, 6)))
+
+
+def test_polar_factor_tall():
+    # uses the eigendecomposition of the Gram matrix
+    check_polar_factor(random_matrices((3, 13, 4)))
+
+
+def test_polar_factor_wide():
+    check_polar_factor(random_matrices((3, 4, 13)))
+
+
+def test_polar_factor_near_unitary():
+    # uses Newton-Schulz iterations
+    U = svd_polar_factor(random_matrices((3, 6, 6)))
+    check_polar_factor(U + 1e-3 * random_matrices((3, 6, 6), seed=1))
+    V = svd_polar_factor(random_matrices((3, 13, 4)))
+    check_polar_factor(V + 1e-3 * random_matrices((3, 13, 4), seed=1))
+
+
+def test_polar_factor_near_singular():
+    # the Gram matrix is ill-conditioned, falls back to the SVD
+    U, _, Vh = np.linalg.svd(random_matrices((3, 13, 4)), full_matrices=False)
+    s = np.array([1., 0.5, 0.2, 1e-9])
+    check_polar_factor((U * s[None, None, :]) @ Vh)
+    U, _, Vh = np.linalg.svd(random_matrices((3, 5, 5)), full_matrices=False)
+    s = np.array([1., 0.5, 0.2, 0.1, 1e-9])
+    check_polar_factor((U * s[None, None, :]) @ Vh)
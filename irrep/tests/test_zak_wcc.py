@@ -0,0 +1,108 @@
+import os
+import subprocess
+from pathlib import Path
+import numpy as np
+
+TEST_FILES_PATH = Path(__file__).parents[2] / "examples"
+
+
+def parse_zak(stdout):
+    """Zak phases (in units of pi) printed by the CLI"""
+    return np.array([float(line.split()[1]) for line in stdout.splitlines()
+                     if "pi gapwidth" in line])
+
+
+def parse_wcc(stdout):
+    """Wannier charge centres printed by the CLI"""
+    text = stdout.split("WCC are :")[1].split("sumWCC")[0]
+    return np.array(text.strip().strip("[]").split(), dtype=float)
+
+
+def check_periodic(z_run, z_ref, period, atol=1e-4):
+    """Compare phases modulo their period"""
+    assert len(z_run) == len(z_ref)
+    dz = (np.array(z_run) - np.array(z_ref) + period / 2) % period - period / 2
+    assert np.allclose(dz, 0, rtol=0., atol=atol), (z_run, z_ref)
+
+
+def remove_output_files():
+    for test_output_file in (
+            "irreptable-template",
+            "trace.txt",
+            "irrep-output.json"
+    ):
+        if os.path.exists(test_output_file):
+            os.remove(test_output_file)
+
+
+def test_zak_vasp_scalar():
+
+    os.chdir(TEST_FILES_PATH / "vasp_scalar")
+
+    command = [
+        "irrep",
+        "-code=vasp",
+        "-Ecut=50",
+        "-IBend=10",
+        "-ZAK",
+    ]
+    output = subprocess.run(command, capture_output=True, text=True)
+    return_code = output.returncode
+    assert return_code == 0, output.stderr
+
+    # Reference computed with the determinants from numpy.linalg.det
+    z_ref = [0.19396, 0.00000, 0.62962, 0.89017, 0.48244,
+             0.38627, 1.46205, 0.00000, 1.58964, 0.00000]
+    check_periodic(parse_zak(output.stdout), z_ref, period=2)
+
+    remove_output_files()
+
+
+def test_zak_espresso_spinor():
+
+    os.chdir(TEST_FILES_PATH / "espresso_spinor")
+
+    command = [
+        "irrep",
+        "-spinor",
+        "-Ecut=100",
+        "-code=espresso",
+        "-prefix=Bi",
+        "-IBend=10",
+        "-ZAK",
+    ]
+    output = subprocess.run(command, capture_output=True, text=True)
+    return_code = output.returncode
+    assert return_code == 0, output.stderr
+
+    # Reference computed with the determinants from numpy.linalg.det
+    z_ref = [0.91706, 0.00000, 1.54861, 0.43036, 0.67798,
+             0.24091, 1.52214, 1.88337, 0.93535, 0.26018]
+    check_periodic(parse_zak(output.stdout), z_ref, period=2)
+
+    remove_output_files()
+
+
+def test_wcc_espresso_spinor():
+
+    os.chdir(TEST_FILES_PATH / "espresso_spinor")
+
+    command = [
+        "irrep",
+        "-spinor",
+        "-Ecut=100",
+        "-code=espresso",
+        "-prefix=Bi",
+        "-IBend=10",
+        "-WCC",
+    ]
+    output = subprocess.run(command, capture_output=True, text=True)
+    return_code = output.returncode
+    assert return_code == 0, output.stderr
+
+    # Reference computed with the full SVD of the overlaps
+    wcc_ref = [0.07519, 0.08110, 0.32926, 0.33541, 0.50522,
+               0.50775, 0.69614, 0.70217, 0.94667, 0.95120]
+    check_periodic(parse_wcc(output.stdout), wcc_ref, period=1)
+
+    remove_output_files()
@@ -16,6 +16,8 @@
 ##################################################################
 
 
+import functools
+import os
 import numpy as np
 from scipy import constants
 import fortio
@@ -34,10 +36,26 @@ class FortranFileR(fortio.FortranFile):
         Path to the WFK file.
     '''
 
+    # Header type (with byte order) detected for each file, keyed by path, 
+    # size and modification time. Reopening an unchanged file skips the 
+    # scan of all its records done by check_file
+    _header_dtypes = {}
+
     def __init__(self, filename):
 
         print("Using fortio to read")
 
+        stat = os.stat(filename)
+        key = (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns)
+        if key in self._header_dtypes:
+            super().__init__(filename,
+                             mode='r',
+                             header_dtype=self._header_dtypes[key],
+                             auto_endian=False,
+                             check_file=False
+                             )
+            return
+
         try:  # assuming there are not subrecords
             super().__init__(filename,
 			     mode='r',
@@ -56,6 +74,80 @@ class FortranFileR(fortio.FortranFile):
 			     auto_endian=True,
 			     check_file=True
 			     )
+        self._header_dtypes[key] = self.header_dtype
+
+    def read_records(self, dtype, count, size):
+        """
+        Read `count` consecutive records, each holding `size` elements of 
+        type `dtype`. Without subrecords, all of them are read from the 
+        file in a single call.
+
+        Parameters
+        ----------
+        dtype : data type
+            Data type of the elements of the records.
+        count : int
+            Number of records.
+        size : int
+            Number of elements in each record.
+
+        Returns
+        -------
+        array, shape=(count, size)
+            Each row contains the data of a record, in native byte order.
+        """
+        return self.read_block([("data", dtype, count, (size,))])["data"]
+
+    def read_block(self, records):
+        """
+        Read groups of consecutive records of known lengths. Without 
+        subrecords, the whole block is read from the file in a single call 
+        and the arrays returned are views into one buffer.
+
+        Parameters
+        ----------
+        records : list of tuple
+            Each tuple `(name, dtype, count, shape)` describes a group of 
+            `count` consecutive records, each holding an array of type 
+            `dtype` and shape `shape`.
+
+        Returns
+        -------
+        dict
+            For each group, an array of shape `(count,) + shape` in native 
+            byte order, indexed by the name of the group.
+        """
+        block = {}
+        if self.long_records:
+            for name, dtype, count, shape in records:
+                dtype = np.dtype(dtype).newbyteorder(self.byteorder)
+                data = [self.read_record(dtype) for i in range(count)]
+                if any(d.size != np.prod(shape) for d in data):
+                    raise RuntimeError("Unexpected length of record in {}"
+                                       .format(self.file))
+                block[name] = np.array(data, dtype=dtype.newbyteorder("=")
+                                       ).reshape((count,) + tuple(shape))
+            return block
+        layout = []
+        for name, dtype, count, shape in records:
+            dtype = np.dtype(dtype).newbyteorder(self.byteorder)
+            record = np.dtype([("head", self.header_dtype),
+                               ("data", dtype, tuple(shape)),
+                               ("tail", self.header_dtype)])
+            layout.append((name, record, (count,)))
+        data = np.fromfile(self._fp, dtype=layout, count=1)
+        if len(data) != 1:
+            raise RuntimeError("Unexpected end of file {}".format(self.file))
+        for name, dtype, count, shape in records:
+            group = data[name][0]
+            nbytes = group.dtype["data"].itemsize
+            if np.any(group["head"] != nbytes) or np.any(group["tail"] != nbytes):
+                raise RuntimeError("Unexpected length of record in {}"
+                                   .format(self.file))
+            block[name] = group["data"].astype(
+                group.dtype["data"].base.newbyteorder("="), copy=False)
+        return block
+
 
 def str2list(string):
     """
@@ -76,8 +168,7 @@ def str2list(string):
     Ranges can be generated as part of the output `array`. For example, 
     `str2list('1,3-5,7')` will give as ouput `array([1,3,4,5,7])`.
     """
-    return np.hstack([np.arange(*(np.array(s.split("-"), dtype=int) + np.array([0, 1])))
-                      if "-" in s else np.array([int(s)]) for s in string.split(",")])
+    return _parse_ranges(string.split(","))
 
 
 def compstr(string):
@@ -93,15 +184,11 @@ def compstr(string):
     float or complex
         `float` if `string` does not have imaginary part, `complex` otherwise.
     """
-    if "i" in string:
-        if "+" in string:
-            return float(string.split("+")[0]) + 1j * \
-                float(string.split("+")[1].strip("i"))
-        elif "-" in string:
-            return float(string.split("-")[0]) + 1j * \
-                float(string.split("-")[1].strip("i"))
-    else:
-        return float(string)
+    string = string.strip()
+    if string.endswith("i"):
+        # imaginary unit is written as 'i', Python's parser expects 'j'
+        return complex(string[:-1] + "j")
+    return float(string)
 
 
 def str2list_space(string):
@@ -123,9 +210,22 @@ def str2list_space(string):
     Ranges can be generated as part of the output `array`. For example, 
     `str2list('1,3-5,7')` will give as ouput `array([1,3,4,5,7])`.
     """
-    res = np.hstack([np.arange(*(np.array(s.split("-"), dtype=int) + np.array([0, 1])))
-                     if "-" in s else np.array([int(s)]) for s in string.split()])
-    return res
+    return _parse_ranges(string.split())
+
+
+def _parse_ranges(tokens):
+    """
+    Convert tokens like '3' or '3-5' to an array of the integers they 
+    denote (ranges include both ends).
+    """
+    res = []
+    for s in tokens:
+        if "-" in s:
+            start, end = s.split("-")
+            res.extend(range(int(start), int(end) + 1))
+        else:
+            res.append(int(s))
+    return np.array(res, dtype=int)
 
 
 def str2bool(v1):
@@ -146,10 +246,10 @@ def str2bool(v1):
     RuntimeError
         `v1` does not start with 'F', 'f', 'T' nor 't'.
     """
-    v = v1.lower().strip('. ')
-    if v[0] == "f":
+    v = v1.lstrip('. ')[:1].lower()  # only the first character matters
+    if v == "f":
         return False
-    elif v[0] == "t":
+    elif v == "t":
         return True
     else:
         raise RuntimeError(
@@ -187,7 +287,9 @@ def is_round(A, prec=1e-14):
     bool
         `True` if all elements are integers, `False` otherwise.
     """
-    return(np.linalg.norm(A - np.round(A)) < prec)
+    d = np.ravel(A - np.round(A))
+    # squared Frobenius norm, avoids the overhead of np.linalg.norm
+    return bool(np.dot(d, d) < prec * prec)
 
     
 def short(x, nd=3):
@@ -206,12 +308,18 @@ def short(x, nd=3):
     str
         Formatted number, with `nd` decimals saved.
     """
-    fmt = "{{0:+.{0}f}}".format(nd)
-    if abs(x.imag) < 10 ** (-nd):
+    fmt, tol = _short_format(nd)
+    if abs(x.imag) < tol:
         return fmt.format(x.real)
-    if abs(x.real) < 10 ** (-nd):
+    if abs(x.real) < tol:
         return fmt.format(x.imag) + "j"
-    return short(x.real, nd) + short(1j * x.imag)
+    return fmt.format(x.real) + fmt.format(x.imag) + "j"
+
+
+@functools.lru_cache(maxsize=16)
+def _short_format(nd):
+    """Format string and zero threshold used by :func:`short`."""
+    return "{0:+." + str(nd) + "f}", 10 ** (-nd)
 
 
 def split(l):
@@ -245,11 +353,118 @@ def format_matrix(A):
     str
         Description of the matrix. Ready to be printed.
     """
-    return "".join(
-        "   ".join("{0:+5.2f} {1:+5.2f}".format(x.real, x.imag) for x in a)
-        + "\n"
-        for a in A
-    )
+    A = np.asarray(A)
+    cells = np.char.add(np.char.mod("%+5.2f ", A.real),
+                        np.char.mod("%+5.2f", A.imag))
+    return "".join("   ".join(a) + "\n" for a in cells)
+
+
+def leading_minors(A, tol=1e-3):
+    """
+    Compute the leading principal minors of a stack of square matrices by 
+    Gaussian elimination without pivoting, vectorized over the stack. 
+    Elimination is unstable if a pivot is small, so the minors of matrices 
+    with a pivot smaller than `tol` times their largest element are 
+    computed instead with `np.linalg.det`, which uses partial pivoting.
+
+    Parameters
+    ----------
+    A : array, shape=(...,N,N)
+        Stack of square matrices.
+    tol : float, default=1e-3
+        Relative threshold for the magnitude of the pivots.
+
+    Returns
+    -------
+    array, shape=(...,N)
+        `minors[...,n-1]` is the determinant of `A[...,:n,:n]`.
+    """
+    A0 = np.asarray(A)
+    A = np.array(A0, dtype=complex)
+    N = A.shape[-1]
+    minors = np.empty(A.shape[:-1], dtype=complex)
+    det = np.ones(A.shape[:-2], dtype=complex)
+    small = np.zeros(A.shape[:-2], dtype=bool)
+    scale = tol * np.abs(A).max(axis=(-2, -1), initial=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for j in range(N):
+            pivot = A[..., j, j].copy()
+            small |= ~(np.abs(pivot) > scale)
+            det = det * pivot
+            minors[..., j] = det
+            # Schur complement of the leading block
+            A[..., j + 1:, j + 1:] -= (A[..., j + 1:, j, None]
+                                       * A[..., j, None, j + 1:]
+                                       / pivot[..., None, None])
+    if small.any():
+        B = A0[small]
+        for n in range(1, N + 1):
+            minors[small, n - 1] = np.linalg.det(B[:, :n, :n])
+    return minors
+
+
+def polar_factor(A):
+    r"""
+    Unitary factor of the polar decomposition of a matrix, obtained from 
+    its economy-size singular value decomposition :math:`A=USV^\dagger` 
+    as :math:`UV^\dagger`. If `A` is at least twice as tall (wide) as wide 
+    (tall), it is obtained instead from the eigendecomposition of the 
+    smaller Gram matrix :math:`A^\dagger A` (:math:`AA^\dagger`), unless 
+    this is ill-conditioned. Matrices close to unitary (isometric) are 
+    handled by a few Newton-Schulz iterations, which take only matrix 
+    products. Stacks of matrices are decomposed in a single batched call.
+
+    Parameters
+    ----------
+    A : array, shape=(...,M,N)
+        Matrix (or stack of matrices) to decompose.
+
+    Returns
+    -------
+    array, shape=(...,M,N)
+        Unitary (isometric, if `A` is not square) factor of `A`.
+    """
+    A = np.asarray(A)
+    M, N = A.shape[-2:]
+
+    # Newton-Schulz iteration X -> X (3 - X^+ X) / 2, written in terms of
+    # the deviation D = X^+ X - 1 as X -> X - X D / 2. It converges
+    # quadratically if the singular values are close to 1, so once the
+    # residual is below 1e-8 one more step reaches machine precision
+    X = A
+    eye = np.eye(min(M, N))
+    # The diagonal of D holds the squared norms of the columns (rows) of A
+    # minus 1. If one of them is already too large, as for most overlap
+    # matrices, skip the iterations without computing the Gram matrix
+    norms = np.einsum('...ij,...ij->...j' if M >= N else '...ij,...ij->...i',
+                      A.conj(), A).real
+    iterations = 6 if np.max(np.abs(norms - 1), initial=0) <= 0.1 else 0
+    for i in range(iterations):
+        XH = X.conj().swapaxes(-1, -2)
+        D = XH @ X if M >= N else X @ XH
+        D -= eye
+        residual = np.max(np.abs(D), initial=0)
+        if residual > 0.1:
+            break
+        D = X @ D if M >= N else D @ X
+        D *= 0.5
+        X = X - D
+        if residual < 1e-8:
+            return X
+
+    if M > 2 * N or N > 2 * M:
+        tall = M > N
+        AH = A.conj().swapaxes(-1, -2)
+        gram = AH @ A if tall else A @ AH
+        # np.linalg.eigh uses the divide-and-conquer driver (heevd) and,
+        # unlike scipy.linalg.eigh, handles stacks of matrices
+        w, V = np.linalg.eigh(gram)
+        if np.all(w[..., 0] > 1e-10 * w[..., -1]):
+            # inverse square root of the Gram matrix
+            isqrt = (V / np.sqrt(w)[..., None, :]) @ V.conj().swapaxes(-1, -2)
+            return A @ isqrt if tall else isqrt @ A
+    U, _, Vh = np.linalg.svd(A, full_matrices=False)
+    return U @ Vh
 
 
 def log_message(msg, verbosity, level):
@@ -258,8 +473,9 @@ def log_message(msg, verbosity, level):
 
     Parameters
     ----------
-    msg : str
-        Message to print
+    msg : str or callable
+        Message to print. If callable, it is called without arguments to 
+        build the message, only when it is going to be printed
     verbosity : int
         Verbosity set for the current run of the code
     level : int
@@ -267,4 +483,4 @@ def log_message(msg, verbosity, level):
     '''
 
     if verbosity >= level:
-        print(msg)
\ No newline at end of file
+        print(msg() if callable(msg) else msg)
\ No newline at end of file